@@ -1,7 +1,8 @@
 """Terraform出力の評価ロジック（改善版）"""
+import functools
 import subprocess
 import re
-import json
+import orjson
 from pathlib import Path
 from difflib import SequenceMatcher
 from rich.console import Console
@@ -9,119 +10,201 @@ from .models import EvaluationResult, TerraformFiles
 
 console = Console()
 
+# 利用可能ならGoogle re2（DFAベースでバックトラックなし）を使う
+try:
+    import re2 as _re
+except ImportError:
+    _re = re
 
-def run_terraform_validate(terraform_dir: Path) -> tuple[bool, str]:
+# 利用可能ならRapidFuzz（difflibと同じIndel類似度のC++実装）を使う
+try:
+    from rapidfuzz.distance import Indel as _Indel
+except ImportError:
+    _Indel = None
+
+# リソース抽出用の正規表現（モジュールロード時に一度だけコンパイル）
+_RESOURCE_RE = _re.compile(r'resource\s+"([^"]+)"\s+"([^"]+)"')
+_DATA_RE = _re.compile(r'data\s+"([^"]+)"\s+"([^"]+)"')
+
+# HCLトークン（文字列リテラル・識別子・構造記号）の抽出用
+_TOKEN_RE = re.compile(r'"[^"]*"|[A-Za-z_][\w-]*|[{}\[\]=]')
+
+
+@functools.lru_cache(maxsize=1024)
+def _tokenize(terraform_code: str) -> tuple[str, ...]:
+    """HCLコードをトークン列に変換
+
+    トークンは文字列のまま保持する。SequenceMatcherもRapidFuzzも
+    ハッシュ可能な要素の列を受け取れるため整数IDへの変換は不要で、
+    変換表のような共有可変状態も持たずに済む（_tokenizeは学習データ
+    読み込みのスレッドプールとevaluateのワーカースレッドの両方から
+    並行に呼ばれる）。
     """
-    terraform validateを実行
-    
-    Returns:
-        tuple: (成功したか, エラーメッセージ)
+    return tuple(_TOKEN_RE.findall(terraform_code))
+
+
+# validate出力とtflint出力の境界マーカー
+_CHECKS_SPLIT = "__TFLINT_SPLIT__"
+_INIT_FAILED = "__INIT_FAILED__"
+_VALIDATE_FAILED = "__VALIDATE_FAILED__"
+
+def _build_checks_script(skip_init: bool) -> str:
+    """init / validate / tflintを1回のfork/execにまとめたシェルスクリプトを構築
+
+    initの正常出力は捨て（リターンコードとstderrだけ見れば十分）、
+    stdoutはvalidateとtflintのJSONのみにする。
+    初期化済みディレクトリではinitを丸ごとスキップする。
+    result.returncodeは最後のtflintのものになるため、validateの
+    終了ステータスはマーカーでstdoutに埋め込んで伝える。
     """
-    try:
-        # terraform init
-        init_result = subprocess.run(
-            ["terraform", "init", "-backend=false"],
-            cwd=terraform_dir,
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-        
-        if init_result.returncode != 0:
-            return False, f"terraform init failed: {init_result.stderr}"
-        
-        # terraform validate
-        validate_result = subprocess.run(
-            ["terraform", "validate", "-json"],
-            cwd=terraform_dir,
-            capture_output=True,
-            text=True,
-            timeout=60
+    validate_part = f"terraform validate -json || echo {_VALIDATE_FAILED}; "
+    if not skip_init:
+        validate_part = (
+            "if terraform init -backend=false >/dev/null; then "
+            + validate_part
+            + f"else echo {_INIT_FAILED}; fi; "
         )
-        
-        try:
-            result_json = json.loads(validate_result.stdout)
-            if result_json.get("valid", False):
-                return True, ""
-            else:
-                errors = result_json.get("diagnostics", [])
-                error_msgs = [e.get("summary", "") for e in errors if e.get("severity") == "error"]
-                return False, "; ".join(error_msgs)
-        except json.JSONDecodeError:
-            if validate_result.returncode != 0:
-                return False, validate_result.stderr
+    return (
+        validate_part +
+        f"echo {_CHECKS_SPLIT}; "
+        "tflint --init >/dev/null 2>&1; "
+        "tflint --format=json"
+    )
+
+
+def _parse_validate_output(output: str, stderr: str) -> tuple[bool, str]:
+    """terraform validateのJSON出力を解析"""
+    if _INIT_FAILED in output:
+        return False, f"terraform init failed: {stderr}"
+
+    # validateは構文エラーでも終了コード1＋valid:falseのJSONを出すので、
+    # JSONがパースできる限りはその内容を正とし、マーカーは除去するだけでよい
+    output = output.replace(_VALIDATE_FAILED, "")
+    try:
+        result_json = orjson.loads(output)
+        if result_json.get("valid", False):
             return True, ""
-    
-    except subprocess.TimeoutExpired:
-        return False, "Terraform command timed out"
-    except FileNotFoundError:
-        return False, "Terraform not found"
-    except Exception as e:
-        return False, str(e)
+        else:
+            errors = result_json.get("diagnostics", [])
+            error_msgs = [e.get("summary", "") for e in errors if e.get("severity") == "error"]
+            return False, "; ".join(error_msgs)
+    except orjson.JSONDecodeError:
+        # JSONが出ていない＝validate自体がクラッシュ等で実行できていない
+        return False, f"terraform validate produced no JSON output: {stderr.strip()}"
+
+
+def _parse_tflint_output(output: str) -> tuple[int, list[str]]:
+    """tflintのJSON出力を解析"""
+    try:
+        issues = orjson.loads(output)
+        if isinstance(issues, dict):
+            issues = issues.get("issues", [])
+        warnings = [f"{i.get('rule', {}).get('name', 'unknown')}: {i.get('message', '')}"
+                   for i in issues]
+        return len(warnings), warnings
+    except orjson.JSONDecodeError:
+        return 0, []  # tflintがない場合も出力が空になりスキップされる
 
 
-def run_tflint(terraform_dir: Path) -> tuple[int, list[str]]:
+def run_terraform_checks(terraform_dir: Path) -> tuple[bool, str, int, list[str]]:
     """
-    tflintを実行して静的解析
-    
+    terraform init + validate + tflintを1回のサブプロセスで実行
+
+    4回のfork/exec（init / validate / tflint --init / tflint）を
+    1つのシェル起動にまとめ、プロセス生成コストを削減する。
+
     Returns:
-        tuple: (警告数, 警告メッセージリスト)
+        tuple: (validate成功したか, エラーメッセージ, 警告数, 警告メッセージリスト)
     """
+    # プラグインが初期化済みならinitをスキップ（2回目以降はほぼ確実にヒット）
+    skip_init = (
+        (terraform_dir / ".terraform").exists()
+        and (terraform_dir / ".terraform.lock.hcl").exists()
+    )
+
     try:
-        # tflint init
-        subprocess.run(
-            ["tflint", "--init"],
-            cwd=terraform_dir,
-            capture_output=True,
-            timeout=60
-        )
-        
-        # tflint実行
         result = subprocess.run(
-            ["tflint", "--format=json"],
+            ["bash", "-c", _build_checks_script(skip_init)],
             cwd=terraform_dir,
             capture_output=True,
             text=True,
-            timeout=60
+            timeout=300  # 従来の各コマンドのタイムアウト合計
         )
-        
-        try:
-            issues = json.loads(result.stdout)
-            if isinstance(issues, dict):
-                issues = issues.get("issues", [])
-            warnings = [f"{i.get('rule', {}).get('name', 'unknown')}: {i.get('message', '')}" 
-                       for i in issues]
-            return len(warnings), warnings
-        except json.JSONDecodeError:
-            return 0, []
-    
+
+        validate_out, _, tflint_out = result.stdout.partition(_CHECKS_SPLIT)
+        validate_passed, validate_error = _parse_validate_output(validate_out, result.stderr)
+        tflint_warnings, tflint_messages = _parse_tflint_output(tflint_out)
+        return validate_passed, validate_error, tflint_warnings, tflint_messages
+
     except subprocess.TimeoutExpired:
-        return 0, ["tflint timed out"]
+        return False, "Terraform command timed out", 0, []
     except FileNotFoundError:
-        return 0, []  # tflintがない場合はスキップ
+        return False, "Terraform not found", 0, []
     except Exception as e:
-        return 0, [str(e)]
+        return False, str(e), 0, []
+
+
+@functools.lru_cache(maxsize=1024)
+def _extract_resources_cached(terraform_code: str) -> frozenset[str]:
+    """リソースタイプの抽出結果をコード文字列単位でキャッシュ"""
+    matches = _RESOURCE_RE.findall(terraform_code)
+    return frozenset(m[0] for m in matches)  # リソースタイプのみ
+
+
+@functools.lru_cache(maxsize=1024)
+def _extract_resource_names_cached(terraform_code: str) -> frozenset[str]:
+    """リソース名（タイプ.名前）の抽出結果をコード文字列単位でキャッシュ"""
+    matches = _RESOURCE_RE.findall(terraform_code)
+    return frozenset(f"{m[0]}.{m[1]}" for m in matches)
 
 
-def extract_resources(terraform_code: str) -> set[str]:
+def extract_resources(terraform_code: str) -> frozenset[str]:
     """Terraformコードからリソースタイプを抽出"""
-    pattern = r'resource\s+"([^"]+)"\s+"([^"]+)"'
-    matches = re.findall(pattern, terraform_code)
-    return {m[0] for m in matches}  # リソースタイプのみ
+    return _extract_resources_cached(terraform_code)
 
 
-def extract_resource_names(terraform_code: str) -> set[str]:
+def extract_resource_names(terraform_code: str) -> frozenset[str]:
     """Terraformコードからリソース名（タイプ.名前）を抽出"""
-    pattern = r'resource\s+"([^"]+)"\s+"([^"]+)"'
-    matches = re.findall(pattern, terraform_code)
-    return {f"{m[0]}.{m[1]}" for m in matches}
+    return _extract_resource_names_cached(terraform_code)
 
 
-def extract_data_sources(terraform_code: str) -> set[str]:
+def warm_expected_caches(expected: TerraformFiles) -> None:
+    """正解データ側の抽出・トークン化キャッシュを事前に温める
+
+    expected.main_tfはイテレーションをまたいで不変なので、読み込み時に
+    一度だけスキャンしておけばevaluate()内では毎回キャッシュヒットになる。
+    """
+    _extract_resources_cached(expected.main_tf)
+    _extract_resource_names_cached(expected.main_tf)
+    _tokenize(expected.main_tf)
+
+
+def extract_data_sources(terraform_code: str) -> frozenset[str]:
     """Terraformコードからデータソースを抽出"""
-    pattern = r'data\s+"([^"]+)"\s+"([^"]+)"'
-    matches = re.findall(pattern, terraform_code)
-    return {m[0] for m in matches}
+    matches = _DATA_RE.findall(terraform_code)
+    return frozenset(m[0] for m in matches)
+
+
+def _token_similarity(gen_tokens: tuple[str, ...], exp_tokens: tuple[str, ...]) -> float:
+    """トークン列同士の類似度（difflibのratio()と同じ定義）を計算
+
+    RapidFuzzがあればC++実装のIndel類似度を使い、なければdifflibで
+    上限値をO(1)のreal_quick_ratio → O(n)のquick_ratio → O(n・m)のratio
+    の順に段階的に評価し、明らかに類似していない場合は早期に打ち切る。
+    """
+    if _Indel is not None:
+        return _Indel.normalized_similarity(gen_tokens, exp_tokens)
+
+    # autojunk=False: 頻出トークン（"aws_"系など）をジャンク扱いする
+    # ヒューリスティックを無効化し、線形スキャンの削減と安定したratioを得る
+    matcher = SequenceMatcher(None, gen_tokens, exp_tokens, autojunk=False)
+    real_quick_upper_bound = matcher.real_quick_ratio()
+    if real_quick_upper_bound < 0.2:
+        return real_quick_upper_bound
+    quick_upper_bound = matcher.quick_ratio()
+    if quick_upper_bound < 0.3:
+        return quick_upper_bound
+    return matcher.ratio()
 
 
 def calculate_resource_match_rate(
@@ -161,11 +244,7 @@ def calculate_config_similarity(
     """設定の類似度を計算（改善版）"""
     gen_main = generated.get("main_tf", "")
     exp_main = expected.main_tf
-    
-    # 空白・改行を正規化
-    gen_normalized = " ".join(gen_main.split())
-    exp_normalized = " ".join(exp_main.split())
-    
+
     # 変数名などの違いを吸収するため、リソース構造を比較
     gen_resources = extract_resource_names(gen_main)
     exp_resources = extract_resource_names(exp_main)
@@ -176,8 +255,9 @@ def calculate_config_similarity(
     else:
         structure_sim = 0.5
     
-    # テキスト類似度
-    text_sim = SequenceMatcher(None, gen_normalized, exp_normalized).ratio()
+    # テキスト類似度（文字単位ではなくトークン単位で比較。
+    # 系列長が1〜2桁短くなるのでO(n・m)のコストが大幅に下がる）
+    text_sim = _token_similarity(_tokenize(gen_main), _tokenize(exp_main))
     
     # 構造を重視（70%）、テキストは参考程度（30%）
     return structure_sim * 0.7 + text_sim * 0.3
@@ -199,14 +279,13 @@ def evaluate(
     - tflint警告なし: 20%
     """
     errors = []
-    
-    # 1. terraform validate（必須）
-    validate_passed, validate_error = run_terraform_validate(terraform_dir)
+
+    # 1. terraform validate + tflint（1回のサブプロセスでまとめて実行）
+    validate_passed, validate_error, tflint_warnings, tflint_messages = run_terraform_checks(terraform_dir)
     if not validate_passed:
         errors.append(f"Validation failed: {validate_error}")
-    
+
     # 2. tflint静的解析
-    tflint_warnings, tflint_messages = run_tflint(terraform_dir)
     if tflint_warnings > 0:
         errors.extend([f"tflint: {msg}" for msg in tflint_messages[:3]])  # 最大3件
     
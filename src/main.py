@@ -1,18 +1,23 @@
 """メインエントリーポイント（改善版フィードバックループ）"""
+import asyncio
+import hashlib
 import os
-import json
+import subprocess
+import httpx
+import msgspec
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from rich.console import Console
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.panel import Panel
 
-from .models import TrainingData, TerraformFiles, TuningIteration
+from .models import TrainingData, TuningIteration
 from .runner import load_skills, generate_terraform, save_terraform_files
-from .evaluator import evaluate
+from .evaluator import evaluate, warm_expected_caches
 from .skills_updater import (
     analyze_errors,
     generate_skills_update,
@@ -28,33 +33,56 @@ DATA_DIR = BASE_DIR / "data" / "training"
 SKILLS_DIR = BASE_DIR / "skills"
 OUTPUT_DIR = BASE_DIR / "output"
 RESULTS_DIR = BASE_DIR / "results"
+TF_PLUGIN_CACHE_DIR = BASE_DIR / ".tf_plugin_cache"
+
+
+def _load_training_file(json_file: Path) -> TrainingData:
+    """学習データファイルを1件読み込む"""
+    # msgspecでJSONパースと型検証を1パスで行う
+    data = msgspec.json.decode(json_file.read_bytes(), type=TrainingData)
+    # 正解側の抽出・トークン化は不変なので読み込み時に済ませておく
+    warm_expected_caches(data.terraform_files)
+    return data
+
+
+def _prewarm_plugin_cache(training_data: list[TrainingData]) -> None:
+    """プロバイダプラグインのキャッシュを直列のinitで事前に温める
+
+    TF_PLUGIN_CACHE_DIRは並行書き込みに対して安全ではなく、空のキャッシュに
+    向けてコア数×2のterraform initを同時に走らせるとダウンロードが競合して
+    散発的なinit失敗（＝偽のValidation failed）を生む。ファンアウトの前に
+    代表のproviders.tfで一度だけinitを実行し、以後の並列initがキャッシュの
+    読み取りだけで済むようにする。
+    """
+    if not training_data:
+        return
+    template_dir = OUTPUT_DIR / ".init_template"
+    template_dir.mkdir(parents=True, exist_ok=True)
+    (template_dir / "providers.tf").write_bytes(
+        training_data[0].terraform_files.providers_tf.encode("utf-8")
+    )
+    try:
+        subprocess.run(
+            ["terraform", "init", "-backend=false"],
+            cwd=template_dir,
+            capture_output=True,
+            timeout=300
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        pass  # 事前ウォームは最適化。失敗しても各initが個別に取得する
 
 
 def load_training_data() -> list[TrainingData]:
-    """学習データを読み込む"""
-    data_list = []
-    for json_file in sorted(DATA_DIR.glob("*.json")):
-        with open(json_file, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-            terraform_files = TerraformFiles(
-                main_tf=raw["terraform_files"]["main_tf"],
-                variables_tf=raw["terraform_files"]["variables_tf"],
-                outputs_tf=raw["terraform_files"]["outputs_tf"],
-                providers_tf=raw["terraform_files"]["providers_tf"]
-            )
-            data = TrainingData(
-                id=raw["id"],
-                source=raw["source"],
-                request=raw["request"],
-                terraform_files=terraform_files,
-                tags=raw["tags"]
-            )
-            data_list.append(data)
-    return data_list
+    """学習データを読み込む（ファイル読み込みを並列化）"""
+    json_files = sorted(DATA_DIR.glob("*.json"))
+    if not json_files:
+        return []
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        return list(executor.map(_load_training_file, json_files))
 
 
-def run_single_evaluation(
-    client: Anthropic,
+async def run_single_evaluation(
+    client: AsyncAnthropic,
     data: TrainingData,
     skills: str,
     iteration: int
@@ -62,19 +90,24 @@ def run_single_evaluation(
     """単一データに対する評価を実行"""
     # 出力ディレクトリ
     output_subdir = OUTPUT_DIR / f"iter_{iteration}" / data.id
-    
-    # Terraform生成
-    generated = generate_terraform(client, data.request, skills)
-    
-    # ファイル保存
-    save_terraform_files(generated, output_subdir)
-    
-    # 評価
-    result = evaluate(data.id, generated, data.terraform_files, output_subdir)
-    
+
+    # Terraform生成（ネットワーク待ちの間に他のデータの処理が進む）
+    generated = await generate_terraform(client, data.request, skills)
+
+    # ファイル保存・評価はブロッキングI/Oなのでワーカースレッドへ逃がす
+    await asyncio.to_thread(save_terraform_files, generated, output_subdir)
+    result = await asyncio.to_thread(
+        evaluate, data.id, generated, data.terraform_files, output_subdir
+    )
+
     return generated, result
 
 
+# 結果テーブルのセル定義（行ごとのif/elif分岐を引き表に置き換える）
+_VALIDATE_CELLS = ("[red]✗[/red]", "[green]✓[/green]")  # [False, True]
+_SCORE_STYLES = ((0.7, "green"), (0.5, "yellow"), (-1.0, "red"))
+
+
 def print_results_table(results: list, title: str = "Evaluation Results") -> None:
     """結果をテーブル表示"""
     table = Table(title=title)
@@ -83,45 +116,44 @@ def print_results_table(results: list, title: str = "Evaluation Results") -> Non
     table.add_column("Resource Match", justify="right")
     table.add_column("Config Match", justify="right")
     table.add_column("Overall Score", justify="right", style="bold")
-    
+
     for result in results:
-        validate_icon = "✓" if result.validate_passed else "✗"
-        validate_style = "green" if result.validate_passed else "red"
-        
-        # スコアに応じた色
-        score = result.overall_score
-        if score >= 0.7:
-            score_style = "green"
-        elif score >= 0.5:
-            score_style = "yellow"
-        else:
-            score_style = "red"
-        
+        validate_cell = _VALIDATE_CELLS[result.validate_passed]
+        # スコアに応じた色（しきい値表の先頭から最初に超えたものを採用）
+        score_style = next(
+            style for threshold, style in _SCORE_STYLES
+            if result.overall_score >= threshold
+        )
+
         table.add_row(
             result.data_id,
-            f"[{validate_style}]{validate_icon}[/{validate_style}]",
+            validate_cell,
             f"{result.resource_match_rate:.2%}",
             f"{result.config_match_rate:.2%}",
             f"[{score_style}]{result.overall_score:.2%}[/{score_style}]"
         )
-    
+
     console.print(table)
 
 
-def save_iteration_results(iteration_result: TuningIteration) -> None:
-    """イテレーション結果を保存"""
+def save_iteration_results(iteration_result: TuningIteration, run_started: str) -> None:
+    """イテレーション結果を保存（一時ファイル経由のアトミック書き込み）"""
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    result_file = RESULTS_DIR / f"iteration_{iteration_result.iteration}_{timestamp}.json"
-    
-    with open(result_file, "w", encoding="utf-8") as f:
-        json.dump(iteration_result.model_dump(), f, indent=2, ensure_ascii=False)
-    
+
+    result_file = RESULTS_DIR / f"iteration_{iteration_result.iteration}_{run_started}.json"
+
+    # msgspecはStructグラフを中間dictなしで直接エンコードできる。
+    # 一時ファイルに書いてからrenameすることでCtrl+C時の部分書き込みを防ぐ
+    tmp_file = result_file.with_suffix(".json.tmp")
+    tmp_file.write_bytes(
+        msgspec.json.format(msgspec.json.encode(iteration_result), indent=2)
+    )
+    os.replace(tmp_file, result_file)
+
     console.print(f"[blue]ℹ[/blue] Results saved: {result_file}")
 
 
-def run_tuning_loop(
+async def run_tuning_loop(
     max_iterations: int = 5,
     target_score: float = 0.85
 ) -> None:
@@ -140,11 +172,32 @@ def run_tuning_loop(
         console.print("[red]Error: ANTHROPIC_API_KEY not set[/red]")
         return
     
-    client = Anthropic(api_key=api_key)
-    
+    # 並列ファンアウト時にTLSハンドシェイクを繰り返さないよう、
+    # keep-aliveコネクションプールを同時実行数以上に確保した1クライアントを共有する
+    client = AsyncAnthropic(
+        api_key=api_key,
+        max_retries=5,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=32,
+                max_keepalive_connections=32,
+                keepalive_expiry=60.0
+            ),
+            timeout=httpx.Timeout(120.0, connect=10.0)
+        )
+    )
+
+    # AWSプロバイダプラグインを全output_subdirで共有し、
+    # terraform initのたびに再ダウンロードされるのを防ぐ
+    TF_PLUGIN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("TF_PLUGIN_CACHE_DIR", str(TF_PLUGIN_CACHE_DIR))
+
     # 学習データ読み込み
     training_data = load_training_data()
     console.print(f"[blue]ℹ[/blue] Loaded {len(training_data)} training data")
+
+    # 並列initがキャッシュ書き込みで競合しないよう、先に1回だけ直列でinitする
+    await asyncio.to_thread(_prewarm_plugin_cache, training_data)
     
     # スキルファイルパス
     skills_path = SKILLS_DIR / "terraform-aws.md"
@@ -154,10 +207,22 @@ def run_tuning_loop(
     best_validate_rate = 0.0
     best_skills = load_skills(skills_path)
     best_iteration = 0
+
+    # 現在のSkillsはメモリ上で持ち回る（プロセス内で外部編集は起きないため、
+    # イテレーションごとにディスクから読み直す必要はない）
+    current_skills = best_skills
     
     # スコア履歴
     score_history = []
-    
+
+    # 前イテレーションのskillsハッシュと結果（skills不変なら評価を再利用）
+    prev_skills_hash = None
+    prev_results = None
+
+    # 結果ファイル名用のタイムスタンプは実行開始時に1回だけ計算し、
+    # 同一実行のイテレーションが同じ接尾辞でまとまるようにする
+    run_started = datetime.now().strftime("%Y%m%d_%H%M%S")
+
     console.print(Panel.fit(
         "[bold]改善版チューニングループ[/bold]\n"
         "• スコアが上がった場合のみSkillsを更新\n"
@@ -166,116 +231,153 @@ def run_tuning_loop(
         title="Tuning Strategy"
     ))
     
-    for iteration in range(1, max_iterations + 1):
-        console.print(f"\n[bold cyan]{'='*50}[/bold cyan]")
-        console.print(f"[bold cyan]  Iteration {iteration} / {max_iterations}[/bold cyan]")
-        console.print(f"[bold cyan]{'='*50}[/bold cyan]")
+    # Richのレンダリングスレッドはイテレーションごとに起動し直さず、
+    # 1つのProgressをループ全体で使い回す
+    # 再描画は最大10回/秒に間引き、完了したタスク行は畳む
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console,
+        refresh_per_second=10,
+        transient=True
+    ) as progress:
+        for iteration in range(1, max_iterations + 1):
+            console.print(f"\n[bold cyan]{'='*50}[/bold cyan]")
+            console.print(f"[bold cyan]  Iteration {iteration} / {max_iterations}[/bold cyan]")
+            console.print(f"[bold cyan]{'='*50}[/bold cyan]")
         
-        # スキル読み込み
-        skills = load_skills(skills_path)
-        
-        # 各データで評価
-        results = []
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console
-        ) as progress:
-            task = progress.add_task("Evaluating...", total=len(training_data))
-            
-            for data in training_data:
-                progress.update(task, description=f"Evaluating {data.id}...")
-                _, result = run_single_evaluation(client, data, skills, iteration)
-                results.append(result)
-                progress.advance(task)
-        
-        # 結果表示
-        print_results_table(results, f"Iteration {iteration} Results")
+            # スキル（メモリ上の現行版を使用）
+            skills = current_skills
+
+            # Skillsが前イテレーションと同一（ロールバック・更新スキップ後）なら、
+            # 生成も評価も同じ結果になるため丸ごと再利用する
+            skills_hash = hashlib.sha256(skills.encode("utf-8")).digest()
+            if skills_hash == prev_skills_hash and prev_results is not None:
+                console.print("[blue]ℹ[/blue] Skills未変更のため前イテレーションの評価結果を再利用")
+                results = list(prev_results)
+            else:
+                # 各データで評価（API呼び出しとterraform実行はI/O待ちが支配的なので並列化）
+                results = []
+                task = progress.add_task("Evaluating...", total=len(training_data))
+
+                # サブプロセスはI/O待ちで眠るのでコア数×2まで同時実行を許す
+                max_concurrency = min(len(training_data), (os.cpu_count() or 4) * 2)
+                semaphore = asyncio.Semaphore(max_concurrency)
+
+                async def _evaluate_bounded(data: TrainingData):
+                    async with semaphore:
+                        return await run_single_evaluation(client, data, skills, iteration)
+
+                # 完了ごとの説明文更新（フルフレーム再描画）はやめ、advanceだけ行う
+                pending = [asyncio.create_task(_evaluate_bounded(d)) for d in training_data]
+                for coro in asyncio.as_completed(pending):
+                    _, result = await coro
+                    results.append(result)
+                    progress.advance(task)
+
+                progress.remove_task(task)
+
+                # 完了順は非決定的なので、表示・保存はdata_id順に揃える
+                results.sort(key=lambda r: r.data_id)
+
+            prev_skills_hash = skills_hash
+            prev_results = results
+
+            # 結果表示
+            print_results_table(results, f"Iteration {iteration} Results")
         
-        # スコア計算
-        avg_score = sum(r.overall_score for r in results) / len(results)
-        validate_pass_rate = sum(1 for r in results if r.validate_passed) / len(results)
+            # スコア計算
+            # 1パスで両方の集計を行う
+            total_score = 0.0
+            passed_count = 0
+            for r in results:
+                total_score += r.overall_score
+                passed_count += r.validate_passed
+            avg_score = total_score / len(results)
+            validate_pass_rate = passed_count / len(results)
         
-        score_history.append({
-            "iteration": iteration,
-            "avg_score": avg_score,
-            "validate_rate": validate_pass_rate
-        })
+            score_history.append({
+                "iteration": iteration,
+                "avg_score": avg_score,
+                "validate_rate": validate_pass_rate
+            })
         
-        console.print(f"\n[bold]Average Score: {avg_score:.2%}[/bold]")
-        console.print(f"[bold]Validate Pass Rate: {validate_pass_rate:.2%}[/bold]")
+            console.print(f"\n[bold]Average Score: {avg_score:.2%}[/bold]")
+            console.print(f"[bold]Validate Pass Rate: {validate_pass_rate:.2%}[/bold]")
         
-        # ベストスコア更新判定
-        should_update_skills = False
-        update_reason = ""
+            # ベストスコア更新判定
+            should_update_skills = False
+            update_reason = ""
         
-        if validate_pass_rate >= best_validate_rate:
-            if avg_score > best_score:
-                should_update_skills = True
-                update_reason = f"スコア向上: {best_score:.2%} → {avg_score:.2%}"
-                best_score = avg_score
-                best_validate_rate = validate_pass_rate
-                best_skills = skills
-                best_iteration = iteration
-            elif validate_pass_rate > best_validate_rate:
-                should_update_skills = True
-                update_reason = f"validate通過率向上: {best_validate_rate:.2%} → {validate_pass_rate:.2%}"
-                best_validate_rate = validate_pass_rate
-                best_skills = skills
-                best_iteration = iteration
+            if validate_pass_rate >= best_validate_rate:
+                if avg_score > best_score:
+                    should_update_skills = True
+                    update_reason = f"スコア向上: {best_score:.2%} → {avg_score:.2%}"
+                    best_score = avg_score
+                    best_validate_rate = validate_pass_rate
+                    best_skills = skills
+                    best_iteration = iteration
+                elif validate_pass_rate > best_validate_rate:
+                    should_update_skills = True
+                    update_reason = f"validate通過率向上: {best_validate_rate:.2%} → {validate_pass_rate:.2%}"
+                    best_validate_rate = validate_pass_rate
+                    best_skills = skills
+                    best_iteration = iteration
         
-        # ベストスコア表示
-        console.print(f"\n[bold green]Best Score: {best_score:.2%} (Iteration {best_iteration})[/bold green]")
-        console.print(f"[bold green]Best Validate Rate: {best_validate_rate:.2%}[/bold green]")
+            # ベストスコア表示
+            console.print(f"\n[bold green]Best Score: {best_score:.2%} (Iteration {best_iteration})[/bold green]")
+            console.print(f"[bold green]Best Validate Rate: {best_validate_rate:.2%}[/bold green]")
         
-        # 目標達成チェック
-        if avg_score >= target_score and validate_pass_rate >= 1.0:
-            console.print(f"\n[green bold]✓ Target achieved! Score: {avg_score:.2%}[/green bold]")
-            break
+            # 目標達成チェック
+            if avg_score >= target_score and validate_pass_rate >= 1.0:
+                console.print(f"\n[green bold]✓ Target achieved! Score: {avg_score:.2%}[/green bold]")
+                break
         
-        # スコアが下がった場合はロールバック
-        if validate_pass_rate < best_validate_rate:
-            console.print(f"\n[yellow]⚠ Validate率が低下 ({validate_pass_rate:.2%} < {best_validate_rate:.2%})[/yellow]")
-            console.print("[yellow]  → ベストSkillsにロールバック[/yellow]")
-            save_skills(best_skills, skills_path)
-            continue
+            # スコアが下がった場合はロールバック
+            if validate_pass_rate < best_validate_rate:
+                console.print(f"\n[yellow]⚠ Validate率が低下 ({validate_pass_rate:.2%} < {best_validate_rate:.2%})[/yellow]")
+                console.print("[yellow]  → ベストSkillsにロールバック[/yellow]")
+                save_skills(best_skills, skills_path)
+                current_skills = best_skills
+                continue
         
-        # Skills更新（スコアが上がった場合のみ）
-        if iteration < max_iterations:
-            if should_update_skills:
-                console.print(f"\n[green]✓ {update_reason}[/green]")
-                console.print("[green]  → Skillsを更新[/green]")
+            # Skills更新（スコアが上がった場合のみ）
+            if iteration < max_iterations:
+                if should_update_skills:
+                    console.print(f"\n[green]✓ {update_reason}[/green]")
+                    console.print("[green]  → Skillsを更新[/green]")
                 
-                # バックアップ
-                backup_skills(skills_path, iteration)
+                    # バックアップ
+                    backup_skills(skills_path, iteration)
                 
-                # エラー分析
-                error_analysis = analyze_errors(results)
+                    # エラー分析
+                    error_analysis = analyze_errors(results)
                 
-                # スキル更新
-                new_skills, updates = generate_skills_update(client, skills, error_analysis)
+                    # スキル更新
+                    new_skills, updates = await generate_skills_update(client, skills, error_analysis)
                 
-                # 更新内容表示
-                if updates:
-                    console.print("\n[bold]Skills Updates:[/bold]")
-                    for update in updates[:5]:  # 最大5件表示
-                        console.print(f"  • {update}")
+                    # 更新内容表示
+                    if updates:
+                        console.print("\n[bold]Skills Updates:[/bold]")
+                        for update in updates[:5]:  # 最大5件表示
+                            console.print(f"  • {update}")
                 
-                # 保存
-                save_skills(new_skills, skills_path)
-            else:
-                console.print(f"\n[yellow]⚠ スコアが向上しませんでした[/yellow]")
-                console.print("[yellow]  → Skills更新をスキップ[/yellow]")
+                    # 保存
+                    save_skills(new_skills, skills_path)
+                    current_skills = new_skills
+                else:
+                    console.print(f"\n[yellow]⚠ スコアが向上しませんでした[/yellow]")
+                    console.print("[yellow]  → Skills更新をスキップ[/yellow]")
         
-        # イテレーション結果保存
-        iteration_result = TuningIteration(
-            iteration=iteration,
-            avg_score=avg_score,
-            validate_pass_rate=validate_pass_rate,
-            results=results,
-            skills_updates=updates if should_update_skills else []
-        )
-        save_iteration_results(iteration_result)
+            # イテレーション結果保存
+            iteration_result = TuningIteration(
+                iteration=iteration,
+                avg_score=avg_score,
+                validate_pass_rate=validate_pass_rate,
+                results=results,
+                skills_updates=updates if should_update_skills else []
+            )
+            save_iteration_results(iteration_result, run_started)
     
     # 最終結果サマリー
     console.print("\n" + "="*60)
@@ -309,4 +411,4 @@ def run_tuning_loop(
 
 
 if __name__ == "__main__":
-    run_tuning_loop()
+    asyncio.run(run_tuning_loop())
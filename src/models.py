@@ -1,9 +1,9 @@
 """データモデル定義"""
-from pydantic import BaseModel
+import msgspec
 from typing import Optional
 
 
-class TerraformFiles(BaseModel):
+class TerraformFiles(msgspec.Struct, frozen=True):
     """Terraformファイルセット"""
     main_tf: str
     variables_tf: str
@@ -11,7 +11,7 @@ class TerraformFiles(BaseModel):
     providers_tf: str
 
 
-class TrainingData(BaseModel):
+class TrainingData(msgspec.Struct, frozen=True):
     """学習データ"""
     id: str
     source: str
@@ -20,22 +20,21 @@ class TrainingData(BaseModel):
     tags: list[str]
 
 
-class EvaluationResult(BaseModel):
+class EvaluationResult(msgspec.Struct, frozen=True):
     """評価結果"""
     data_id: str
     validate_passed: bool
-    validate_error: Optional[str] = None
     resource_match_rate: float  # 0.0 - 1.0
     config_match_rate: float  # 0.0 - 1.0
     overall_score: float  # 0.0 - 1.0
     errors: list[str]
+    validate_error: Optional[str] = None
 
 
-class TuningIteration(BaseModel):
+class TuningIteration(msgspec.Struct, frozen=True):
     """チューニングイテレーション結果"""
     iteration: int
     avg_score: float
     validate_pass_rate: float
     results: list[EvaluationResult]
     skills_updates: list[str]
-
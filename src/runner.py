@@ -1,34 +1,66 @@
 """Claude APIを使ってskillsを実行し、Terraformを生成"""
+import functools
+import hashlib
 import os
+import re
 from pathlib import Path
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from rich.console import Console
 
+import orjson
+
 console = Console()
 
+# 生成結果のローカルキャッシュ。(model, skills, request)が同一なら
+# API呼び出しをスキップしてパース済みの結果を返す
+_CACHE_DIR = Path(__file__).parent.parent / "output" / ".cache"
 
-def load_skills(skills_path: Path) -> str:
-    """skillsファイルを読み込む"""
-    return skills_path.read_text(encoding="utf-8")
 
+def _cache_key(model: str, skills: str, request: str) -> str:
+    """キャッシュキー（内容アドレス）を計算"""
+    payload = "\x00".join((model, skills, request)).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
 
-def generate_terraform(
-    client: Anthropic,
-    request: str,
-    skills: str,
-    model: str = "claude-sonnet-4-20250514"
-) -> dict[str, str]:
-    """
-    依頼文からTerraformコードを生成
-    
-    Returns:
-        dict: main_tf, variables_tf, outputs_tf, providers_tf のキーを持つ辞書
+
+def _cache_read(key: str) -> dict[str, str] | None:
+    """キャッシュヒットならパース済みの結果を返す"""
+    cache_file = _CACHE_DIR / f"{key}.json"
+    try:
+        return orjson.loads(cache_file.read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return None
+
+
+def _cache_write(key: str, result: dict[str, str]) -> None:
+    """結果をアトミックにキャッシュへ書き込む"""
+    _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_file = _CACHE_DIR / f"{key}.json"
+    tmp_file = cache_file.with_suffix(".json.tmp")
+    tmp_file.write_bytes(orjson.dumps(result))
+    os.replace(tmp_file, cache_file)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_skills_cached(path_str: str, mtime_ns: int) -> str:
+    """mtimeをキーに含めてskillsファイルの内容をメモ化する"""
+    return Path(path_str).read_text(encoding="utf-8")
+
+
+def load_skills(skills_path: Path) -> str:
+    """skillsファイルを読み込む
+
+    (パス, mtime)でメモ化しているため、save_skills等で書き換えられると
+    mtimeが進んで自然にキャッシュが無効化される。未更新のイテレーションでは
+    ディスクを読まずに同一の文字列オブジェクトを返す。
     """
-    system_prompt = f"""あなたはAWS Terraformの専門家です。以下のスキル定義に従って、ユーザーの依頼からTerraformコードを生成してください。
+    return _load_skills_cached(str(skills_path), skills_path.stat().st_mtime_ns)
 
-{skills}
 
-## 出力形式
+# システムプロンプトの静的部分。skills本体と分離しておくことで、
+# skillsブロックをプロンプトキャッシュの境界にできる
+_SYSTEM_PREAMBLE = """あなたはAWS Terraformの専門家です。以下のスキル定義に従って、ユーザーの依頼からTerraformコードを生成してください。"""
+
+_OUTPUT_FORMAT_INSTRUCTIONS = """## 出力形式
 
 必ず以下の4つのセクションに分けて出力してください。各セクションは必ず指定のマーカーで囲んでください：
 
@@ -66,17 +98,121 @@ def generate_terraform(
 - AWSのベストプラクティスに従うこと
 """
 
-    response = client.messages.create(
+
+def _build_system_blocks(skills: str) -> list[dict]:
+    """システムプロンプトのブロック列を構築
+
+    出力形式の指示までがリクエスト間で不変のプレフィックスなので、
+    末尾ブロックにcache_controlを置いてシステムプロンプト全体を
+    プレフィックスキャッシュの対象にする。skillsが更新されると
+    文字列が変わり、自然にキャッシュミスとして再構築される。
+    """
+    return [
+        {"type": "text", "text": _SYSTEM_PREAMBLE},
+        {"type": "text", "text": skills},
+        {
+            "type": "text",
+            "text": _OUTPUT_FORMAT_INSTRUCTIONS,
+            "cache_control": {"type": "ephemeral"},
+        },
+    ]
+
+
+def _latency_headers() -> dict[str, str] | None:
+    """低遅延サービングを要求するextra_headersを返す（未設定ならNone）
+
+    betaフラグの文字列はモデルや時期で変わるため、コードに埋め込まず
+    ANTHROPIC_LATENCY_BETA環境変数の値をそのままanthropic-betaヘッダに渡す。
+    未設定ならデフォルトのサービング経路のまま。WebUIのTTFT短縮用で、
+    コード変更なしにトグルできる。
+    """
+    beta = os.getenv("ANTHROPIC_LATENCY_BETA")
+    return {"anthropic-beta": beta} if beta else None
+
+
+def _build_messages(request: str) -> list[dict]:
+    """ユーザーメッセージを構築"""
+    return [
+        {"role": "user", "content": f"以下の要望に基づいてTerraformコードを生成してください：\n\n{request}"}
+    ]
+
+
+async def stream_terraform(
+    client: AsyncAnthropic,
+    request: str,
+    skills: str,
+    model: str = "claude-sonnet-4-20250514"
+):
+    """Terraform生成をストリーミングし、テキスト断片を順次yieldする
+
+    generate_terraformと同じプロンプトを使うが、最終トークンを待たずに
+    断片を返すため、WebUIでは最初のトークン到着から表示を始められる。
+    """
+    async with client.messages.stream(
         model=model,
         max_tokens=8192,
-        system=system_prompt,
-        messages=[
-            {"role": "user", "content": f"以下の要望に基づいてTerraformコードを生成してください：\n\n{request}"}
-        ]
+        system=_build_system_blocks(skills),
+        messages=_build_messages(request),
+        extra_headers=_latency_headers()
+    ) as stream:
+        async for text in stream.text_stream:
+            yield text
+
+
+async def generate_terraform(
+    client: AsyncAnthropic,
+    request: str,
+    skills: str,
+    model: str = "claude-sonnet-4-20250514"
+) -> dict[str, str]:
+    """
+    依頼文からTerraformコードを生成
+
+    Returns:
+        dict: main_tf, variables_tf, outputs_tf, providers_tf のキーを持つ辞書
+    """
+    # Skillsが更新されなかったイテレーションでは同一の(skills, request)で
+    # 再呼び出しされるため、ローカルキャッシュでAPIコストを丸ごと省く。
+    # GENERATE_NO_CACHE=1で無効化できる（モデル側の挙動変化を検証する逃げ道）
+    key = _cache_key(model, skills, request)
+    if not os.getenv("GENERATE_NO_CACHE"):
+        cached = _cache_read(key)
+        if cached is not None:
+            return cached
+    # skillsブロックにcache_controlを付け、同一skillsでの連続呼び出しでは
+    # サーバ側でプレフィックスのKVキャッシュが再利用されるようにする。
+    # レート制限（429）・接続断のリトライはクライアントのmax_retriesに任せる
+    # （ここで独自ループを重ねると試行回数が乗算で膨らむ）
+    response = await client.messages.create(
+        model=model,
+        max_tokens=8192,
+        system=_build_system_blocks(skills),
+        messages=_build_messages(request),
+        extra_headers=_latency_headers()
     )
 
+    # キャッシュヒット状況を観測できるようにしておく
+    usage = response.usage
+    cache_read = getattr(usage, "cache_read_input_tokens", None)
+    cache_created = getattr(usage, "cache_creation_input_tokens", None)
+    if cache_read or cache_created:
+        console.print(
+            f"[dim]prompt cache: read={cache_read} created={cache_created}[/dim]"
+        )
+
     content = response.content[0].text
-    return parse_terraform_output(content)
+    result = parse_terraform_output(content)
+    _cache_write(key, result)
+    return result
+
+
+# [XXX_TF_START]〜[XXX_TF_END]の4セクションを1パスで抽出する
+_TF_BLOCK_RE = re.compile(
+    r"\[(MAIN|VARIABLES|OUTPUTS|PROVIDERS)_TF_START\](.*?)\[\1_TF_END\]",
+    re.DOTALL
+)
+# コードブロックのフェンス（```terraform / ```hcl / ```）の除去用
+_FENCE_RE = re.compile(r"^```(?:terraform|hcl)?\s*$", re.MULTILINE)
 
 
 def parse_terraform_output(content: str) -> dict[str, str]:
@@ -87,25 +223,12 @@ def parse_terraform_output(content: str) -> dict[str, str]:
         "outputs_tf": "",
         "providers_tf": ""
     }
-    
-    # 各セクションを抽出
-    markers = [
-        ("main_tf", "[MAIN_TF_START]", "[MAIN_TF_END]"),
-        ("variables_tf", "[VARIABLES_TF_START]", "[VARIABLES_TF_END]"),
-        ("outputs_tf", "[OUTPUTS_TF_START]", "[OUTPUTS_TF_END]"),
-        ("providers_tf", "[PROVIDERS_TF_START]", "[PROVIDERS_TF_END]"),
-    ]
-    
-    for key, start_marker, end_marker in markers:
-        start_idx = content.find(start_marker)
-        end_idx = content.find(end_marker)
-        
-        if start_idx != -1 and end_idx != -1:
-            extracted = content[start_idx + len(start_marker):end_idx].strip()
-            # コードブロックマーカーを除去
-            extracted = extracted.replace("```terraform", "").replace("```hcl", "").replace("```", "").strip()
-            result[key] = extracted
-    
+
+    # 8回のstr.findの代わりに、コンパイル済み正規表現でバッファを1回走査する
+    for match in _TF_BLOCK_RE.finditer(content):
+        key = f"{match.group(1).lower()}_tf"
+        result[key] = _FENCE_RE.sub("", match.group(2)).strip()
+
     return result
 
 
@@ -120,8 +243,9 @@ def save_terraform_files(terraform_files: dict[str, str], output_dir: Path) -> N
         "providers_tf": "providers.tf"
     }
     
+    # エンコード済みバイト列をそのまま書き出す。Richのレンダリングは高コストなので
+    # ファイルごとではなくディレクトリ単位で1回だけログを出す
     for key, filename in file_mapping.items():
-        filepath = output_dir / filename
-        filepath.write_text(terraform_files[key], encoding="utf-8")
-        console.print(f"  [green]✓[/green] {filepath}")
+        (output_dir / filename).write_bytes(terraform_files[key].encode("utf-8"))
+    console.print(f"  [green]✓[/green] wrote {len(file_mapping)} files to {output_dir}")
 
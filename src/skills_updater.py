@@ -1,11 +1,18 @@
 """Skills自動更新ロジック（改善版）"""
+import re
+import shutil
+from collections import Counter
 from pathlib import Path
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from rich.console import Console
 from .models import EvaluationResult
 
 console = Console()
 
+# エラーメッセージのパターン（evaluator.pyのevaluate()が生成）。
+# Missing/Extraを1つの正規表現で捕捉し、エラー文字列の走査を1回にする
+_ERR_RE = re.compile(r"(Missing|Extra) resources: (.+)")
+
 
 def analyze_errors(results: list[EvaluationResult]) -> dict:
     """
@@ -22,7 +29,11 @@ def analyze_errors(results: list[EvaluationResult]) -> dict:
         "low_score_cases": [],
         "high_score_cases": []    # 成功パターンも収集
     }
-    
+
+    # C実装のCounterで集計（Pythonレベルのdict.getループを排除）
+    missing = Counter()
+    extra = Counter()
+
     for result in results:
         # バリデーションエラー
         if not result.validate_passed:
@@ -30,17 +41,14 @@ def analyze_errors(results: list[EvaluationResult]) -> dict:
                 "data_id": result.data_id,
                 "error": result.validate_error
             })
-        
-        # エラー分析
+
+        # エラー分析（1つの正規表現でMissing/Extra両方を判定）
         for error in result.errors:
-            if "Missing resources" in error:
-                resources = error.replace("Missing resources: ", "").split(", ")
-                for r in resources:
-                    analysis["missing_resources"][r] = analysis["missing_resources"].get(r, 0) + 1
-            elif "Extra resources" in error:
-                resources = error.replace("Extra resources: ", "").split(", ")
-                for r in resources:
-                    analysis["extra_resources"][r] = analysis["extra_resources"].get(r, 0) + 1
+            match = _ERR_RE.match(error)
+            if match:
+                target = missing if match.group(1) == "Missing" else extra
+                # 区切りの空白ゆらぎに耐えるよう","で分割してstripする
+                target.update(r.strip() for r in match.group(2).split(","))
             elif "tflint" in error:
                 analysis["tflint_warnings"].append(error)
         
@@ -57,19 +65,17 @@ def analyze_errors(results: list[EvaluationResult]) -> dict:
                 "score": result.overall_score
             })
     
-    # 頻出する不足リソースをソート
-    analysis["missing_resources"] = dict(
-        sorted(analysis["missing_resources"].items(), key=lambda x: -x[1])
-    )
-    analysis["extra_resources"] = dict(
-        sorted(analysis["extra_resources"].items(), key=lambda x: -x[1])
-    )
-    
+    # 頻出上位のみ保持（most_common(n)は内部でheapq.nlargestを使うため
+    # 全件ソートのO(K log K)ではなくO(K log n)で済む）。
+    # 上位20件に絞ることで、改善プロンプトに流し込むトークン量も抑えられる
+    analysis["missing_resources"] = dict(missing.most_common(20))
+    analysis["extra_resources"] = dict(extra.most_common(20))
+
     return analysis
 
 
-def generate_skills_update(
-    client: Anthropic,
+async def generate_skills_update(
+    client: AsyncAnthropic,
     current_skills: str,
     error_analysis: dict,
     model: str = "claude-sonnet-4-20250514"
@@ -141,7 +147,7 @@ def generate_skills_update(
 - 複雑化を避け、シンプルに保つ
 """
 
-    response = client.messages.create(
+    response = await client.messages.create(
         model=model,
         max_tokens=8192,
         messages=[
@@ -176,16 +182,35 @@ def generate_skills_update(
     return new_skills, updates
 
 
+def _write_if_changed(content: str, path: Path) -> bool:
+    """内容が変化している場合だけファイルに書き込む
+
+    バイト同一ならno-op。余計なmtime更新を避けることで、
+    mtimeキーのload_skillsキャッシュも無効化されない。
+
+    Returns:
+        bool: 書き込んだかどうか
+    """
+    encoded = content.encode("utf-8")
+    if path.exists() and path.read_bytes() == encoded:
+        return False
+    path.write_bytes(encoded)
+    return True
+
+
 def save_skills(skills_content: str, skills_path: Path) -> None:
-    """スキルファイルを保存"""
-    skills_path.write_text(skills_content, encoding="utf-8")
-    console.print(f"[green]✓[/green] Skills saved: {skills_path}")
+    """スキルファイルを保存（内容が同一なら書き込みをスキップ）"""
+    if _write_if_changed(skills_content, skills_path):
+        console.print(f"[green]✓[/green] Skills saved: {skills_path}")
+    else:
+        console.print(f"[blue]ℹ[/blue] Skills unchanged: {skills_path}")
 
 
 def backup_skills(skills_path: Path, iteration: int) -> Path:
     """スキルファイルをバックアップ"""
     backup_path = skills_path.parent / f"{skills_path.stem}_backup_{iteration}{skills_path.suffix}"
     if skills_path.exists():
-        backup_path.write_text(skills_path.read_text(encoding="utf-8"), encoding="utf-8")
+        # decode→encodeのラウンドトリップを避け、カーネルレベルのコピーに任せる
+        shutil.copy2(skills_path, backup_path)
         console.print(f"[blue]ℹ[/blue] Skills backed up: {backup_path}")
     return backup_path
@@ -1,439 +1,300 @@
 """WebUI for Terraform generation"""
+import asyncio
+import functools
+import hashlib
 import os
+import re
+import time
 from pathlib import Path
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, StrictStr
 from dotenv import load_dotenv
-from anthropic import Anthropic
+import httpx
+import orjson
+from anthropic import AsyncAnthropic
 
-from .runner import load_skills, generate_terraform
+from .runner import load_skills, generate_terraform, parse_terraform_output, stream_terraform
 
 load_dotenv()
 
-app = FastAPI(title="Terraform Generator", description="Claude Skills-based Terraform Generator")
+# レスポンスのJSON化はorjson（C実装）に任せる。数KBの*_tf文字列を返す
+# /api/generateでは、stdlib jsonのエスケープ走査がそのままCPU時間になる
+app = FastAPI(
+    title="Terraform Generator",
+    description="Claude Skills-based Terraform Generator",
+    default_response_class=ORJSONResponse,
+)
+
+
+class _SelectiveGZipMiddleware(GZipMiddleware):
+    """SSEルートを圧縮対象から外すGZipMiddleware
+
+    GZipMiddlewareはストリーミング応答の断片もGzipFileに書き込むだけで
+    フラッシュしないため、トークン単位のdata:イベントがzlibバッファに
+    滞留し、ブラウザへは数KB単位のバーストでしか届かなくなる。
+    text/event-streamのルートは素通しして逐次配信を保つ。
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/api/generate/stream":
+            await self.app(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
+
+
+# HTML/JSONレスポンスを転送前に圧縮する（~10KBのindex.htmlが3〜4KBになる）。
+# 1KB未満はヘッダ増分で逆効果になりやすいので素通しし、圧縮レベルは
+# デフォルトの9から5に下げてCPU時間と圧縮率のバランスを取る
+app.add_middleware(_SelectiveGZipMiddleware, minimum_size=1024, compresslevel=5)
 
 BASE_DIR = Path(__file__).parent.parent
 SKILLS_DIR = BASE_DIR / "skills"
+STATIC_DIR = BASE_DIR / "static"
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client(api_key: str) -> AsyncAnthropic:
+    """APIキー単位でAnthropicクライアント（=httpxコネクションプール）を共有する
+
+    リクエストごとに生成するとTLSハンドシェイクとプール構築を
+    毎回やり直すことになるため、プロセス内で使い回す。
+    デフォルトのhttpxプールはkeep-aliveが20本で期限も短く、バーストで
+    ハンドシェイクをやり直すため、明示的にプールを広げておく。
+    """
+    return AsyncAnthropic(
+        api_key=api_key,
+        max_retries=5,  # 429・接続断のリトライはSDKの1層のみで行う
+        http_client=httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=2000,
+                max_keepalive_connections=500,
+                keepalive_expiry=60.0
+            )
+        )
+    )
+
+
+@app.on_event("startup")
+async def _load_skills_once():
+    """skillsを起動時に1回だけ読み込み、app.stateに保持する
+
+    プロセス存続中に内容が変わらないファイルをリクエストごとに
+    stat+readするのは無駄で、イベントループ上のブロッキングI/Oにもなる。
+    欠落していればここで即座に失敗させ、起動後のリクエストで
+    初めて気づく事態を避ける。
+    """
+    skills_path = SKILLS_DIR / "terraform-aws.md"
+    if not skills_path.exists():
+        raise RuntimeError(f"Skills file not found: {skills_path}")
+    app.state.skills = load_skills(skills_path)
 
 
+@app.on_event("startup")
+async def _prewarm_connection():
+    """起動時にAnthropicへのコネクションを温めておく
+
+    最初のユーザーリクエストがDNS+TCP+TLSセットアップ（150〜300ms）を
+    支払わないよう、安価なモデル一覧APIを1回叩いて共有プールに
+    keep-aliveコネクションを確保する。失敗してもサービスには影響しない。
+    """
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        return
+    try:
+        await _get_client(api_key).models.list(limit=1)
+    except Exception:
+        pass  # 事前ウォームは最適化であり、失敗は本処理で顕在化する
+
+
+# StrictStr + 代入時検証オフで、pydanticの型強制（coercion）パスを
+# スキップする。数KBの*_tf文字列を再走査しないぶん応答が軽くなる。
+# モデル本体をmsgspec化しない理由：FastAPIのボディ検証・OpenAPIスキーマ
+# 生成がpydantic前提で、自前のdecode/encode層を挟む価値がないため
 class GenerateRequest(BaseModel):
-    request: str
+    model_config = {"extra": "ignore", "validate_assignment": False}
+
+    request: StrictStr
 
 
 class GenerateResponse(BaseModel):
+    model_config = {"extra": "ignore", "validate_assignment": False}
+
     success: bool
-    main_tf: str = ""
-    variables_tf: str = ""
-    outputs_tf: str = ""
-    providers_tf: str = ""
-    error: str = ""
-
-
-@app.get("/", response_class=HTMLResponse)
-async def index():
-    return """<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Terraform Generator</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-            background-color: #FFFFFF;
-            color: #1A1A1A;
-            line-height: 1.6;
-        }
-        
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 60px 24px;
-        }
-        
-        header {
-            margin-bottom: 48px;
-        }
-        
-        h1 {
-            font-size: 28px;
-            font-weight: 400;
-            color: #1A1A1A;
-            margin-bottom: 8px;
-        }
-        
-        .subtitle {
-            font-size: 14px;
-            color: #6B7280;
-        }
-        
-        .input-section {
-            margin-bottom: 48px;
-        }
-        
-        label {
-            display: block;
-            font-size: 13px;
-            color: #6B7280;
-            margin-bottom: 12px;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }
-        
-        textarea {
-            width: 100%;
-            min-height: 120px;
-            padding: 16px;
-            border: 1px solid #E5E7EB;
-            border-radius: 4px;
-            font-size: 15px;
-            font-family: inherit;
-            resize: vertical;
-            transition: border-color 0.2s;
-        }
-        
-        textarea:focus {
-            outline: none;
-            border-color: #6B7280;
-        }
-        
-        button {
-            padding: 12px 32px;
-            background-color: #1A1A1A;
-            color: #FFFFFF;
-            border: none;
-            border-radius: 4px;
-            font-size: 14px;
-            cursor: pointer;
-            transition: background-color 0.2s;
-            margin-top: 16px;
-        }
-        
-        button:hover {
-            background-color: #333333;
-        }
-        
-        button:disabled {
-            background-color: #9CA3AF;
-            cursor: not-allowed;
-        }
-        
-        .output-section {
-            display: none;
-        }
-        
-        .output-section.visible {
-            display: block;
-        }
-        
-        .output-header {
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            margin-bottom: 24px;
-            padding-bottom: 16px;
-            border-bottom: 1px solid #E5E7EB;
-        }
-        
-        .output-header h2 {
-            font-size: 18px;
-            font-weight: 400;
-        }
-        
-        .tabs {
-            display: flex;
-            gap: 8px;
-            margin-bottom: 24px;
-            border-bottom: 1px solid #E5E7EB;
-        }
-        
-        .tab {
-            padding: 12px 20px;
-            background: none;
-            border: none;
-            font-size: 14px;
-            color: #6B7280;
-            cursor: pointer;
-            position: relative;
-            margin: 0;
-        }
-        
-        .tab.active {
-            color: #1A1A1A;
-        }
-        
-        .tab.active::after {
-            content: '';
-            position: absolute;
-            bottom: -1px;
-            left: 0;
-            right: 0;
-            height: 2px;
-            background-color: #1A1A1A;
-        }
-        
-        .code-container {
-            background-color: #F9FAFB;
-            border: 1px solid #E5E7EB;
-            border-radius: 4px;
-            overflow: hidden;
-        }
-        
-        .code-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 12px 16px;
-            background-color: #F3F4F6;
-            border-bottom: 1px solid #E5E7EB;
-        }
-        
-        .code-header span {
-            font-size: 13px;
-            color: #6B7280;
-        }
-        
-        .copy-btn {
-            padding: 6px 12px;
-            font-size: 12px;
-            background-color: #FFFFFF;
-            color: #1A1A1A;
-            border: 1px solid #E5E7EB;
-            margin: 0;
-        }
-        
-        .copy-btn:hover {
-            background-color: #F9FAFB;
-        }
-        
-        pre {
-            padding: 20px;
-            overflow-x: auto;
-            font-family: 'SF Mono', 'Consolas', 'Monaco', monospace;
-            font-size: 13px;
-            line-height: 1.5;
-            margin: 0;
-        }
-        
-        .tab-content {
-            display: none;
-        }
-        
-        .tab-content.active {
-            display: block;
-        }
-        
-        .loading {
-            display: none;
-            text-align: center;
-            padding: 40px;
-            color: #6B7280;
-        }
-        
-        .loading.visible {
-            display: block;
-        }
-        
-        .error {
-            padding: 16px;
-            background-color: #FEF2F2;
-            border: 1px solid #FECACA;
-            border-radius: 4px;
-            color: #991B1B;
-            margin-bottom: 24px;
-            display: none;
-        }
-        
-        .error.visible {
-            display: block;
-        }
-        
-        .status {
-            font-size: 12px;
-            color: #6B7280;
-            margin-top: 8px;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>Terraform Generator</h1>
-            <p class="subtitle">Claude Skillsを使用してAWSインフラのTerraformコードを生成</p>
-        </header>
-        
-        <section class="input-section">
-            <label for="request">要望を入力</label>
-            <textarea id="request" placeholder="例: 高可用性のWebアプリケーション基盤を構築したい。ALBで負荷分散し、EC2をAuto Scalingで配置、RDSはMulti-AZで冗長化。"></textarea>
-            <button id="generate-btn" onclick="generateTerraform()">Terraform生成</button>
-            <p class="status" id="status"></p>
-        </section>
-        
-        <div class="error" id="error"></div>
-        
-        <div class="loading" id="loading">
-            <p>生成中...</p>
-        </div>
-        
-        <section class="output-section" id="output-section">
-            <div class="output-header">
-                <h2>生成結果</h2>
-            </div>
-            
-            <div class="tabs">
-                <button class="tab active" data-tab="main">main.tf</button>
-                <button class="tab" data-tab="variables">variables.tf</button>
-                <button class="tab" data-tab="outputs">outputs.tf</button>
-                <button class="tab" data-tab="providers">providers.tf</button>
-            </div>
-            
-            <div class="tab-content active" id="tab-main">
-                <div class="code-container">
-                    <div class="code-header">
-                        <span>main.tf</span>
-                        <button class="copy-btn" onclick="copyCode('main')">コピー</button>
-                    </div>
-                    <pre id="code-main"></pre>
-                </div>
-            </div>
-            
-            <div class="tab-content" id="tab-variables">
-                <div class="code-container">
-                    <div class="code-header">
-                        <span>variables.tf</span>
-                        <button class="copy-btn" onclick="copyCode('variables')">コピー</button>
-                    </div>
-                    <pre id="code-variables"></pre>
-                </div>
-            </div>
-            
-            <div class="tab-content" id="tab-outputs">
-                <div class="code-container">
-                    <div class="code-header">
-                        <span>outputs.tf</span>
-                        <button class="copy-btn" onclick="copyCode('outputs')">コピー</button>
-                    </div>
-                    <pre id="code-outputs"></pre>
-                </div>
-            </div>
-            
-            <div class="tab-content" id="tab-providers">
-                <div class="code-container">
-                    <div class="code-header">
-                        <span>providers.tf</span>
-                        <button class="copy-btn" onclick="copyCode('providers')">コピー</button>
-                    </div>
-                    <pre id="code-providers"></pre>
-                </div>
-            </div>
-        </section>
-    </div>
-    
-    <script>
-        // Tab switching
-        document.querySelectorAll('.tab').forEach(tab => {
-            tab.addEventListener('click', () => {
-                document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
-                document.querySelectorAll('.tab-content').forEach(c => c.classList.remove('active'));
-                
-                tab.classList.add('active');
-                document.getElementById('tab-' + tab.dataset.tab).classList.add('active');
-            });
-        });
-        
-        async function generateTerraform() {
-            const request = document.getElementById('request').value.trim();
-            if (!request) {
-                showError('要望を入力してください');
-                return;
-            }
-            
-            const btn = document.getElementById('generate-btn');
-            const loading = document.getElementById('loading');
-            const output = document.getElementById('output-section');
-            const error = document.getElementById('error');
-            const status = document.getElementById('status');
-            
-            btn.disabled = true;
-            loading.classList.add('visible');
-            output.classList.remove('visible');
-            error.classList.remove('visible');
-            status.textContent = '';
-            
-            try {
-                const response = await fetch('/api/generate', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({ request })
-                });
-                
-                const data = await response.json();
-                
-                if (data.success) {
-                    document.getElementById('code-main').textContent = data.main_tf;
-                    document.getElementById('code-variables').textContent = data.variables_tf;
-                    document.getElementById('code-outputs').textContent = data.outputs_tf;
-                    document.getElementById('code-providers').textContent = data.providers_tf;
-                    output.classList.add('visible');
-                    status.textContent = '生成完了';
-                } else {
-                    showError(data.error || '生成に失敗しました');
-                }
-            } catch (e) {
-                showError('エラーが発生しました: ' + e.message);
-            } finally {
-                btn.disabled = false;
-                loading.classList.remove('visible');
-            }
-        }
-        
-        function showError(message) {
-            const error = document.getElementById('error');
-            error.textContent = message;
-            error.classList.add('visible');
-        }
-        
-        function copyCode(type) {
-            const code = document.getElementById('code-' + type).textContent;
-            navigator.clipboard.writeText(code).then(() => {
-                const btn = event.target;
-                const originalText = btn.textContent;
-                btn.textContent = 'コピー完了';
-                setTimeout(() => {
-                    btn.textContent = originalText;
-                }, 1500);
-            });
-        }
-    </script>
-</body>
-</html>"""
+    main_tf: StrictStr = ""
+    variables_tf: StrictStr = ""
+    outputs_tf: StrictStr = ""
+    providers_tf: StrictStr = ""
+    error: StrictStr = ""
+
+
+# 直近の同一依頼の結果をプロセス内に保持するTTL付きキャッシュ。
+# runner側のディスクキャッシュよりさらに手前で完結し、ヒット時は
+# APIにもディスクにも触れない。デモや検証での同一プロンプト再送が対象
+_GEN_CACHE_MAX = 256
+_GEN_CACHE_TTL = 3600.0
+_gen_cache: dict[bytes, tuple[float, dict[str, str]]] = {}
+
+
+def _gen_cache_key(request: str, skills: str, model: str) -> bytes:
+    """(モデル, skills, 依頼文)からキャッシュキーを計算する"""
+    payload = "\x00".join((model, skills, request)).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def _gen_cache_get(key: bytes) -> dict[str, str] | None:
+    """TTL内ならキャッシュ済みの生成結果を返す"""
+    entry = _gen_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, value = entry
+    if time.monotonic() - stored_at > _GEN_CACHE_TTL:
+        del _gen_cache[key]
+        return None
+    return value
+
+
+def _gen_cache_put(key: bytes, value: dict[str, str]) -> None:
+    """結果を保存する。上限到達時は最も古い挿入分を捨てる"""
+    if len(_gen_cache) >= _GEN_CACHE_MAX:
+        _gen_cache.pop(next(iter(_gen_cache)))
+    _gen_cache[key] = (time.monotonic(), value)
+
+
+# 実行中の同一依頼を1つのAPI呼び出しに相乗りさせるsingle-flightマップ。
+# ダブルクリックや同時送信でAnthropic呼び出しが重複するのを防ぐ
+_inflight: dict[bytes, asyncio.Future] = {}
+
+
+# これらを含む依頼は構成が複雑になりやすく、常に上位モデルに回す
+_COMPLEX_KEYWORDS = (
+    "Auto Scaling", "オートスケーリング",
+    "Multi-AZ", "マルチAZ",
+    "VPC peering", "VPCピアリング",
+    "高可用", "冗長", "フェイルオーバー",
+)
+
+
+def _select_model(request: str) -> str:
+    """依頼の複雑さに応じて生成モデルを選ぶ
+
+    短文でHA系キーワードを含まない依頼（バケット1つ等）はHaiku系で
+    十分な品質が出せ、TTFTも総生成時間も数倍速い。閾値とモデル名は
+    環境変数で差し替えられる。
+    """
+    threshold = int(os.getenv("SIMPLE_REQUEST_MAX_LEN", "120"))
+    if len(request) < threshold and not any(kw in request for kw in _COMPLEX_KEYWORDS):
+        return os.getenv("SIMPLE_REQUEST_MODEL", "claude-3-5-haiku-20241022")
+    return os.getenv("GENERATE_MODEL", "claude-sonnet-4-20250514")
+
+
+def _sse_event(event: str, payload: dict) -> str:
+    """SSEの名前付きイベントを1件フォーマットする"""
+    return f"event: {event}\ndata: {orjson.dumps(payload).decode()}\n\n"
+
+
+@app.get("/api/generate/stream")
+async def generate_stream(request: str):
+    """Terraform生成をSSEでストリーミング配信する
+
+    一括JSONを返す/api/generateと違い、最初のトークンが到着した時点から
+    ブラウザに断片を流せるため、体感の待ち時間が大幅に短くなる。
+    断片は`data: {"delta": ...}`で送り、完了時に`done`イベントで
+    パース済みの4ファイルをまとめて送る。
+    """
+    async def event_stream():
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            yield _sse_event("error", {"error": "ANTHROPIC_API_KEY not set"})
+            return
+
+        skills = app.state.skills
+        client = _get_client(api_key)
+        model = _select_model(request)
+
+        # UIの実経路はこちらなので、TTLキャッシュはここでも必ず引く。
+        # ヒット時はストリーミングせず完成済みの4ファイルを即座に返す
+        key = _gen_cache_key(request, skills, model)
+        cached = _gen_cache_get(key)
+        if cached is not None:
+            yield _sse_event("done", cached)
+            return
+
+        # ダブルクリック等で同一依頼の生成が既に走っていれば、新たな
+        # ストリームは張らず先行リクエストの完成結果に相乗りする
+        future = _inflight.get(key)
+        if future is not None:
+            try:
+                terraform_files = await future
+            except Exception as e:
+                yield _sse_event("error", {"error": str(e)})
+                return
+            yield _sse_event("done", terraform_files)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        chunks = []
+        try:
+            async for delta in stream_terraform(client, request, skills, model=model):
+                chunks.append(delta)
+                yield f"data: {orjson.dumps({'delta': delta}).decode()}\n\n"
+            terraform_files = parse_terraform_output("".join(chunks))
+            future.set_result(terraform_files)
+            _gen_cache_put(key, terraform_files)
+            yield _sse_event("done", terraform_files)
+        except Exception as e:
+            future.set_exception(e)
+            yield _sse_event("error", {"error": str(e)})
+        finally:
+            del _inflight[key]
+            # クライアント切断（GeneratorExit）等で未解決のまま抜けた場合、
+            # 相乗り中の待機側を永久に待たせないようキャンセルする
+            if not future.done():
+                future.cancel()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 @app.post("/api/generate", response_model=GenerateResponse)
-async def generate(req: GenerateRequest):
+async def generate(req: GenerateRequest, response: Response):
     try:
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             return GenerateResponse(success=False, error="ANTHROPIC_API_KEY not set")
-        
-        client = Anthropic(api_key=api_key)
-        skills_path = SKILLS_DIR / "terraform-aws.md"
-        
-        if not skills_path.exists():
-            return GenerateResponse(success=False, error="Skills file not found")
-        
-        skills = load_skills(skills_path)
-        terraform_files = generate_terraform(client, req.request, skills)
+
+        client = _get_client(api_key)
+        skills = app.state.skills
+        model = _select_model(req.request)
+        key = _gen_cache_key(req.request, skills, model)
+        terraform_files = _gen_cache_get(key)
+        response.headers["X-Cache"] = "MISS" if terraform_files is None else "HIT"
+        if terraform_files is None:
+            future = _inflight.get(key)
+            if future is not None:
+                # 同一キーの生成が進行中なら、その結果を待つだけで済む
+                terraform_files = await future
+            else:
+                future = asyncio.get_running_loop().create_future()
+                _inflight[key] = future
+                try:
+                    terraform_files = await generate_terraform(
+                        client, req.request, skills, model=model
+                    )
+                    future.set_result(terraform_files)
+                except Exception as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    del _inflight[key]
+                    # CancelledErrorはexcept Exceptionを素通りする。切断等で
+                    # 未解決のまま抜けた場合、相乗り中の待機側も道連れにする
+                    if not future.done():
+                        future.cancel()
+                _gen_cache_put(key, terraform_files)
         
         return GenerateResponse(
             success=True,
@@ -446,7 +307,46 @@ async def generate(req: GenerateRequest):
         return GenerateResponse(success=False, error=str(e))
 
 
+# コンテンツハッシュ入りのアセット名（app-<sha8>.css等）。内容が変われば
+# ファイル名も変わるため、immutableで無期限キャッシュさせて問題ない
+_HASHED_ASSET_RE = re.compile(r"app-[0-9a-f]{8}\.(?:css|js)$")
+
+
+class _HashedStaticFiles(StaticFiles):
+    """アセットの種類に応じたCache-Controlを付与するStaticFiles
+
+    ハッシュ付きアセットは無期限キャッシュ、それ以外（index.html等）は
+    短いmax-ageを付けてブラウザに条件付きリクエスト（If-None-Match）を
+    させる。ETag/Last-Modifiedと304応答はStaticFilesが処理する。
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if _HASHED_ASSET_RE.search(str(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=60"
+        return response
+
+
+# APIルートをすべて登録した後にマウントする。/api/* 以外のパスは
+# 静的配信になり、index.htmlはPythonコードを一切通らずETag付きで返る
+# （変更がなければ304で応答でき、本文の転送自体が不要になる）
+app.mount("/", _HashedStaticFiles(directory=STATIC_DIR, html=True), name="static")
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # イベントループをuvloop（libuv）、HTTPパーサをhttptoolsのC実装に
+    # 差し替え、コア数ぶんのワーカーで受ける。workers指定にはアプリを
+    # import文字列で渡す必要がある
+    uvicorn.run(
+        "src.web:app",
+        host="0.0.0.0",
+        port=8080,
+        workers=os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+    )
 
@@ -0,0 +1,118 @@
+// 生成結果の4ファイル。非表示タブのDOMへは初回クリックまで書き込まず、
+// 結果到着時のレイアウト処理をmain.tfの1面分に抑える
+window._tfFiles = null;
+
+function populateTab(name) {
+    const pre = document.getElementById('code-' + name);
+    if (window._tfFiles && pre.dataset.populated !== '1') {
+        pre.textContent = window._tfFiles[name];
+        pre.dataset.populated = '1';
+    }
+}
+
+// タブ切り替え。タブごとにリスナーを張らず、.tabsへの委譲1本で捌く
+document.querySelector('.tabs').addEventListener('click', (e) => {
+    const tab = e.target.closest('.tab');
+    if (!tab) return;
+    document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+    document.querySelectorAll('.tab-content').forEach(c => c.classList.remove('active'));
+
+    tab.classList.add('active');
+    populateTab(tab.dataset.tab);
+    document.getElementById('tab-' + tab.dataset.tab).classList.add('active');
+});
+
+document.getElementById('generate-btn').addEventListener('click', generateTerraform);
+
+// コピーもonclick属性ではなく文書全体への委譲で処理する
+document.addEventListener('click', (e) => {
+    const btn = e.target.closest('.copy-btn');
+    if (btn) copyCode(btn.dataset.copy, btn);
+});
+
+function generateTerraform() {
+    const request = document.getElementById('request').value.trim();
+    if (!request) {
+        showError('要望を入力してください');
+        return;
+    }
+
+    const btn = document.getElementById('generate-btn');
+    const loading = document.getElementById('loading');
+    const output = document.getElementById('output-section');
+    const error = document.getElementById('error');
+    const status = document.getElementById('status');
+
+    btn.disabled = true;
+    loading.classList.add('visible');
+    output.classList.remove('visible');
+    error.classList.remove('visible');
+    status.textContent = '';
+
+    // SSEで断片を受信し、到着したそばからmain.tfタブに表示する。
+    // 完了時のdoneイベントでパース済みの4ファイルに置き換える
+    const es = new EventSource('/api/generate/stream?request=' + encodeURIComponent(request));
+    let acc = '';
+    const finish = () => {
+        es.close();
+        btn.disabled = false;
+        loading.classList.remove('visible');
+    };
+
+    es.onmessage = (e) => {
+        acc += JSON.parse(e.data).delta;
+        document.getElementById('code-main').textContent = acc;
+        loading.classList.remove('visible');
+        output.classList.add('visible');
+        status.textContent = '生成中...';
+    };
+
+    es.addEventListener('done', (e) => {
+        const data = JSON.parse(e.data);
+        window._tfFiles = {
+            main: data.main_tf,
+            variables: data.variables_tf,
+            outputs: data.outputs_tf,
+            providers: data.providers_tf
+        };
+        // 表示中のタブだけ即時反映し、残りは初回クリック時に書き込む
+        document.querySelectorAll('.tab-content pre').forEach(pre => {
+            delete pre.dataset.populated;
+        });
+        const active = document.querySelector('.tab.active');
+        populateTab(active ? active.dataset.tab : 'main');
+        output.classList.add('visible');
+        status.textContent = '生成完了';
+        finish();
+    });
+
+    es.addEventListener('error', (e) => {
+        // サーバが送るerrorイベントはdataを持つ。接続断の場合はdataなし
+        if (e.data) {
+            showError(JSON.parse(e.data).error || '生成に失敗しました');
+        } else {
+            showError('接続エラーが発生しました');
+        }
+        finish();
+    });
+}
+
+function showError(message) {
+    const error = document.getElementById('error');
+    error.textContent = message;
+    error.classList.add('visible');
+}
+
+function copyCode(type, btn) {
+    // DOMから読み戻さず、保持しているオブジェクトから直接コピーする
+    const code = window._tfFiles
+        ? window._tfFiles[type]
+        : document.getElementById('code-' + type).textContent;
+    navigator.clipboard.writeText(code).then(() => {
+        const originalText = btn.textContent;
+        btn.textContent = 'コピー完了';
+        setTimeout(() => {
+            btn.textContent = originalText;
+        }, 1500);
+    });
+}